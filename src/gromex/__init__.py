@@ -1 +1,10 @@
-from .grommunio import GrommunioCalendars
+# The classes are imported on first access, so the command line utility can parse its
+# arguments (and answer --help or --version) without loading caldav and its dependencies
+__all__ = ["GrommunioCalendars"]
+
+
+def __getattr__(name):
+    if name == "GrommunioCalendars":
+        from .grommunio import GrommunioCalendars
+        return GrommunioCalendars
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,8 +1,10 @@
+import sys
+import logging
 import argparse
-from gromex import GrommunioCalendars
-import importlib.metadata
 
 def main():
+    import importlib.metadata
+
     # Automatically get the version from the module's metadata
     version = importlib.metadata.version('gromex')
 
@@ -33,11 +35,16 @@ def main():
 
     args = parser.parse_args()
 
-    # Create an instance of GrommunioCalendars using autoconnect
-    grommunio = GrommunioCalendars(username=args.username, password=args.password, url=args.server, autoconnect=True)
+    # Status messages of the library go to stderr, separate from the output of the command
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr, format="%(message)s")
 
-    # Export calendars
-    grommunio.export(path=args.destination, save_single_events=args.save_separate)
+    # Imported only after parsing the arguments - loading caldav is slow and not needed for --help or --version
+    from gromex import GrommunioCalendars
+
+    # Create an instance of GrommunioCalendars using autoconnect
+    with GrommunioCalendars(username=args.username, password=args.password, url=args.server, autoconnect=True) as grommunio:
+        # Export calendars
+        grommunio.export(path=args.destination, save_single_events=args.save_separate)
 
     print(f"Export complete. Files saved to {args.destination}")
 
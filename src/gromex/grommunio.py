@@ -1,10 +1,180 @@
 import os
+import re
+import sys
+import json
+import hashlib
+import logging
+import functools
+import itertools
+import contextlib
 import caldav
-from caldav.lib.error import AuthorizationError
+from caldav.lib.error import AuthorizationError, ReportError
 import getpass  # For safely asking for password
-from icalendar import Calendar
-from tqdm import tqdm  # For progress bar
-from typing import Optional, List
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor  # For exporting calendars concurrently
+from requests.adapters import HTTPAdapter  # For connection pooling
+from urllib3.util.retry import Retry
+from xml.sax.saxutils import escape, quoteattr
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Iterator, Tuple, Dict, Set, Iterable, BinaryIO
+
+logger = logging.getLogger(__name__)
+
+# XML namespaces used in WebDAV/CalDAV requests and responses
+_DAV_NS = "DAV:"
+_CALDAV_NS = "urn:ietf:params:xml:ns:caldav"
+_CALENDARSERVER_NS = "http://calendarserver.org/ns/"
+
+# Sidecar file in the export directory, which remembers what was exported by the previous run
+_CACHE_FILENAME = ".gromex_cache.json"
+
+# PROPFIND request for the CTag of a calendar, which changes whenever any event in it changes,
+# and for its sync token, from which the next export can ask for the changes only
+_COLLECTION_PROPFIND_XML = """<?xml version="1.0" encoding="utf-8"?>
+<D:propfind xmlns:D="DAV:" xmlns:CS="http://calendarserver.org/ns/">
+  <D:prop>
+    <CS:getctag/>
+    <D:sync-token/>
+  </D:prop>
+</D:propfind>"""
+
+# sync-collection REPORT (RFC 6578) listing the resources added, modified or removed since the sync token
+_SYNC_COLLECTION_XML = """<?xml version="1.0" encoding="utf-8"?>
+<D:sync-collection xmlns:D="DAV:">
+  <D:sync-token>{sync_token}</D:sync-token>
+  <D:sync-level>1</D:sync-level>
+  <D:prop>
+    <D:getetag/>
+  </D:prop>
+</D:sync-collection>"""
+
+# calendar-query REPORT returning the requested properties of all events of a calendar in a single response
+_CALENDAR_QUERY_XML = """<?xml version="1.0" encoding="utf-8"?>
+<C:calendar-query xmlns:D="DAV:" xmlns:C="urn:ietf:params:xml:ns:caldav">
+  <D:prop>
+    {props}
+  </D:prop>
+  <C:filter>
+    <C:comp-filter name="VCALENDAR">
+      <C:comp-filter name="VEVENT">{time_range}</C:comp-filter>
+    </C:comp-filter>
+  </C:filter>
+</C:calendar-query>"""
+
+# calendar-query REPORT listing the events and tasks of a calendar in a single response - the
+# calendar data is limited to the UIDs, which is enough to tell the components apart
+_COMPONENTS_QUERY_XML = """<?xml version="1.0" encoding="utf-8"?>
+<C:calendar-query xmlns:D="DAV:" xmlns:C="urn:ietf:params:xml:ns:caldav">
+  <D:prop>
+    <D:getetag/>
+    <C:calendar-data>
+      <C:comp name="VCALENDAR">
+        <C:comp name="VEVENT"><C:prop name="UID"/></C:comp>
+        <C:comp name="VTODO"><C:prop name="UID"/></C:comp>
+      </C:comp>
+    </C:calendar-data>
+  </D:prop>
+  <C:filter>
+    <C:comp-filter name="VCALENDAR"/>
+  </C:filter>
+</C:calendar-query>"""
+
+# calendar-multiget REPORT returning the data of the listed event resources in a single response
+_CALENDAR_MULTIGET_XML = """<?xml version="1.0" encoding="utf-8"?>
+<C:calendar-multiget xmlns:D="DAV:" xmlns:C="urn:ietf:params:xml:ns:caldav">
+  <D:prop>
+    <D:getetag/>
+    {calendar_data}
+  </D:prop>
+  {hrefs}
+</C:calendar-multiget>"""
+
+# Header and footer of the combined calendar files, which are streamed to disk event by event
+_COMBINED_HEADER = b"BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//gromex//EN\r\n"
+_COMBINED_FOOTER = b"END:VCALENDAR\r\n"
+
+# Component types counted by the calendar summary
+_COMPONENT_RE = re.compile(rb"^BEGIN:(VEVENT|VTODO)\s*$", re.M)
+
+# UID property of an iCalendar object, including its folded continuation lines
+_UID_RE = re.compile(rb"^UID(?:;[^:\r\n]*)?:(.*(?:\r?\n[ \t].*)*)", re.M)
+_FOLDING_RE = re.compile(rb"\r?\n[ \t]")
+
+# Characters which are not kept in the file names of single event files
+_UNSAFE_FILENAME_RE = re.compile(r"[^A-Za-z0-9._-]")
+
+# VEVENT block of an iCalendar object
+_VEVENT_RE = re.compile(rb"BEGIN:VEVENT.*?END:VEVENT\r?\n", re.S)
+
+
+def _event_uid(data: bytes) -> str:
+    """
+    Get the UID of an event from its iCalendar data.
+
+    The UID is read with a regular expression - parsing the whole event with icalendar 
+    is only needed if that fails.
+    """
+    match = _UID_RE.search(data)
+    if match:
+        return _FOLDING_RE.sub(b"", match.group(1)).strip().decode('utf-8', errors='replace')
+    from icalendar import Calendar
+    components = [component for component in Calendar.from_ical(data).subcomponents
+                  if component.name == "VEVENT"]
+    return str(components[0]['UID'])
+
+
+def _event_filename(uid: str) -> str:
+    """
+    Get the file name of the single event file of an event, derived from its UID.
+
+    Characters which are not portable in file names are replaced with underscores. As different 
+    UIDs may be replaced by the same name then, a short hash of the UID is appended in this case.
+    """
+    name = _UNSAFE_FILENAME_RE.sub('_', uid)
+    if name != uid:
+        name = f"{name}_{hashlib.sha1(uid.encode('utf-8')).hexdigest()[:8]}"
+    return f"{name}.ics"
+
+
+def _format_utc(value: datetime) -> str:
+    """
+    Format a datetime as the UTC time used in CalDAV time ranges (e.g. "20240101T000000Z").
+    Naive datetimes are interpreted as local time.
+    """
+    return value.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _time_range_attributes(start: Optional[datetime], end: Optional[datetime]) -> str:
+    """
+    Format the `start` and `end` attributes of CalDAV `time-range` and `expand` elements.
+    """
+    attributes = ""
+    if start:
+        attributes += f" start={quoteattr(_format_utc(start))}"
+    if end:
+        attributes += f" end={quoteattr(_format_utc(end))}"
+    return attributes
+
+
+def _time_windows(start: datetime, end: datetime, window_days: int) -> Iterator[Tuple[datetime, datetime]]:
+    """
+    Split the time range between `start` and `end` into consecutive windows of `window_days` days.
+    """
+    window = timedelta(days=window_days)
+    while start < end:
+        yield start, min(start + window, end)
+        start += window
+
+
+def _calendar_data_xml(start: Optional[datetime], end: Optional[datetime], expand: bool) -> str:
+    """
+    Format the `calendar-data` property of a REPORT, asking the server to expand recurring
+    events into their instances between `start` and `end` if `expand` is set.
+    """
+    if expand:
+        return f"<C:calendar-data><C:expand{_time_range_attributes(start, end)}/></C:calendar-data>"
+    return "<C:calendar-data/>"
+
 
 class GrommunioCalendars:
     """
@@ -24,11 +194,24 @@ class GrommunioCalendars:
     cal = GrommunioCalendars(username="john.doe", password="password", autoconnect=False)
     cal.connect()
     cal.export(path="/path/to/export/directory", save_single_events=True, save_combined_calendar=True)
+    cal.close()
+
+    # Use as a context manager to close the connections automatically:
+    with GrommunioCalendars(username="john.doe") as cal:
+        cal.export(path="/path/to/export/directory")
 
     Class Attributes:
     -----------------
     default_max_retries : int
         The default number of retries for password entry in case of an AuthorizationError.
+    default_max_workers : int
+        The default maximum number of calendars exported concurrently.
+    default_pool_connections : int
+        The default number of connection pools (one per host) kept by the HTTP session.
+    default_pool_maxsize : int
+        The default maximum number of connections kept alive per pool.
+    default_multiget_size : int
+        The default maximum number of events downloaded with a single `calendar-multiget` request.
     
     Parameters:
     -----------
@@ -43,6 +226,10 @@ class GrommunioCalendars:
     """
 
     default_max_retries = 3  # Class-level default for max retries
+    default_max_workers = 8  # Class-level default for concurrent exports
+    default_pool_connections = 16  # Class-level defaults for the HTTP connection pool
+    default_pool_maxsize = 32
+    default_multiget_size = 200  # Class-level default for the events downloaded per request
 
     def __init__(self, username: str, password: Optional[str] = None, 
                  url: str = "https://hope.helmholtz-berlin.de", autoconnect: bool = True) -> None:
@@ -50,7 +237,8 @@ class GrommunioCalendars:
         Initializes the GrommunioCalendars class.
 
         Automatically connects to the Grommunio CalDAV server if `autoconnect=True`. 
-        If `password` is not provided, it will prompt for the password.
+        If `password` is not provided, it will prompt for the password once, when it is 
+        first needed to connect - never here.
 
         Parameters:
         -----------
@@ -69,8 +257,12 @@ class GrommunioCalendars:
         self.url = url
         self.__connected = False
         self.principal = None
+        self.client = None
+        self._calendars = None  # Calendars of the principal, listed on first use
+        self._supported_components_cache = {}  # Supported components by calendar URL
+        self._events_cache = {}  # Event listings (href -> ETag) with their CTag by calendar URL
 
-        self.password = password
+        self._password = password  # Prompted for lazily by the `password` property
 
         self.calendar_url = f"{self.url}/dav/calendars/{self.username}/Calendar/"
 
@@ -140,18 +332,19 @@ class GrommunioCalendars:
         if max_retries is None:
             max_retries = self.default_max_retries
 
-        print("Connecting to Grommunio services...")
+        logger.info("Connecting to Grommunio services...")
         retries = 0
         while retries < max_retries:
             try:
                 if not self.principal:
                     self.client = caldav.DAVClient(url=self.calendar_url, username=self.username, password=self.password)
+                    self._configure_session()
                     self.principal = self.client.principal()
-                    print(f"Connected to CalDAV for {self.principal.get_display_name()}.")
+                    logger.info("Connected to CalDAV for %s.", self.principal.get_display_name())
                     self.__connected = True
                     break  # Exit loop after successful connection
             except AuthorizationError:
-                print("Authorization failed. Please try again.")
+                logger.warning("Authorization failed. Please try again.")
                 self.password = None
                 retries += 1
             except Exception as e:
@@ -161,11 +354,42 @@ class GrommunioCalendars:
             raise ConnectionError("Maximum password retries exceeded. Failed to connect to the CalDAV server.")
 
 
+    def _configure_session(self) -> None:
+        """
+        Configure the HTTP session of the CalDAV client for the many requests of an export.
+
+        The session keeps a pool of connections alive, large enough for the concurrently exported 
+        calendars, so TCP and TLS handshakes are not repeated for every request. Connection errors 
+        and transient server errors (502, 503 and 504 responses) are retried with a backoff.
+        """
+        # After the last retry, the error response is returned to caldav instead of raising
+        retries = Retry(total=3, backoff_factor=0.3, status_forcelist=(502, 503, 504), raise_on_status=False,
+                        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS | {"PROPFIND", "REPORT"})
+        adapter = HTTPAdapter(pool_connections=self.default_pool_connections,
+                              pool_maxsize=self.default_pool_maxsize, max_retries=retries)
+        self.client.session.mount("https://", adapter)
+        self.client.session.mount("http://", adapter)
+
+    def close(self) -> None:
+        """
+        Close the HTTP session and its pooled connections to the CalDAV server.
+        """
+        if self.client is not None:
+            self.client.session.close()
+
+    def __enter__(self) -> "GrommunioCalendars":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
     @property
     def calendars(self) -> List[caldav.objects.Calendar]:
         """
         Retrieve the list of calendars after connecting.
 
+        The calendars are listed once and cached - call `refresh_calendars()` to list them again.
+
         Returns:
         --------
         List[caldav.objects.Calendar]:
@@ -178,7 +402,44 @@ class GrommunioCalendars:
         """
         if not self.principal:
             raise ConnectionError("Not connected to the server. Call 'connect()' first or use 'autoconnect=True'.")
-        return self.principal.calendars()
+        if self._calendars is None:
+            self._calendars = self.principal.calendars()
+        return self._calendars
+
+    def refresh_calendars(self) -> None:
+        """
+        Forget the cached list of calendars and their supported components, so they are fetched again on next use.
+        """
+        self._calendars = None
+        self._supported_components_cache.clear()
+
+    def refresh(self) -> None:
+        """
+        Forget the cached event listings of the calendars, so they are fetched again on next use.
+
+        The events of a calendar listed by `show_summary` are reused by `export`, as long as the CTag
+        of the calendar did not change. Call this method to list them again in any case.
+        """
+        self._events_cache.clear()
+
+    def _events_of(self, calendar: caldav.objects.Calendar, ctag: Optional[str]) -> Dict[str, str]:
+        """
+        Get the cached listing of the events of the calendar, fetching it if there is none yet.
+
+        A cached listing is only reused if it was made with the same CTag `ctag` - otherwise the 
+        calendar changed since, and the outdated listing would hide these changes.
+
+        Returns:
+        --------
+        Dict[str, str]:
+            The ETags of the event resources, by href.
+        """
+        url = str(calendar.url)
+        cached_ctag, etags = self._events_cache.get(url, (None, None))
+        if etags is None or ctag is None or cached_ctag != ctag:
+            etags = self._fetch_etags(calendar)
+            self._events_cache[url] = (ctag, etags)
+        return etags
 
     def show_summary(self) -> None:
         """
@@ -195,27 +456,50 @@ class GrommunioCalendars:
         if not self.principal:
             raise ConnectionError("Not connected to the server. Call 'connect()' first or use 'autoconnect=True'.")
         
-        # Loop through each calendar and display information
+        # Loop through each calendar and collect its information, which is printed all at once
+        lines = []
         for calendar in self.calendars:
-            print(f"Calendar Name: {calendar.name}")
+            lines.append(f"Calendar Name: {calendar.name}")
 
             # Get the supported components for this calendar
-            supported_components = calendar.get_supported_components()
-            print(f"Supported Components: {supported_components}")
+            url = str(calendar.url)
+            if url not in self._supported_components_cache:
+                self._supported_components_cache[url] = calendar.get_supported_components()
+            supported_components = self._supported_components_cache[url]
+            lines.append(f"Supported Components: {supported_components}")
+
+            # Fetching events (VEVENT) and tasks (VTODO) counts with a single request. The listing is
+            # reused by `export`, if the calendar did not change - the CTag is fetched first, so any
+            # change made while listing still shows up as a different CTag
+            ctag, _ = self._fetch_collection_tags(calendar)
+            components = self._fetch_components(calendar)
+            self._events_cache[url] = (ctag, components["VEVENT"])
+            event_count = len(components["VEVENT"])  # VEVENT (events)
+            task_count = len(components["VTODO"])    # VTODO (tasks)
 
-            # Fetching events (VEVENT) and tasks (VTODO) counts
-            event_count = len(calendar.events())  # VEVENT (events)
-            task_count = len(calendar.todos())    # VTODO (tasks)
+            lines.append(f" - VEVENT (Events): {event_count} items")
+            lines.append(f" - VTODO (Tasks): {task_count} items")
 
-            print(f" - VEVENT (Events): {event_count} items")
-            print(f" - VTODO (Tasks): {task_count} items")
+        if lines:
+            print("\n".join(lines))
 
-    def export(self, path: str, save_single_events: bool = False, save_combined_calendar: bool = True) -> None:
+    def export(self, path: str, save_single_events: bool = False, save_combined_calendar: bool = True,
+               start: Optional[datetime] = None, end: Optional[datetime] = None, expand: bool = False,
+               window_days: int = 365) -> None:
         """
         Export all calendars and events to the specified directory.
 
         Exports all events in the selected calendars to `.ics` files. Optionally, it can export individual 
-        event files and/or combined `.ics` files for each calendar.
+        event files and/or combined `.ics` files for each calendar. Calendars are exported concurrently, 
+        using up to `default_max_workers` threads.
+
+        The export is incremental: the ETags of the exported events are stored in a `.gromex_cache.json` 
+        file in `path`, and subsequent exports only download the events which were added or changed 
+        since then - the combined calendar is rebuilt from the unchanged events of the previous one and 
+        the downloaded ones, unless it was modified locally. Files of events deleted on the server are 
+        removed. Calendars whose CTag did not change since the previous export are skipped entirely. 
+        Without a time range, the changes are listed with a `sync-collection` REPORT if the server 
+        supports it.
 
         Parameters:
         -----------
@@ -225,46 +509,592 @@ class GrommunioCalendars:
             Whether to save each event as an individual `.ics` file (default: False).
         save_combined_calendar : bool, optional
             Whether to save a combined `.ics` file for each calendar (default: True).
+        start : Optional[datetime], optional
+            Only export events which end after this time (default: no lower bound).
+        end : Optional[datetime], optional
+            Only export events which start before this time (default: no upper bound).
+        expand : bool, optional
+            Whether the server should expand recurring events into their single instances between 
+            `start` and `end`, which are required then (default: False).
+        window_days : int, optional
+            If both `start` and `end` are given, the events are queried in time windows of this many 
+            days, so very large calendars are not transferred in a single huge response (default: 365). 
+            The data of expanded events is always downloaded with a single query.
 
         Raises:
         -------
         ValueError:
-            If the `path` is not provided.
+            If the `path` is not provided, `expand` is set without `start` and `end`, `window_days`
+            is not positive, or the output files of calendars with the same name cannot be told apart.
         ConnectionError:
             If the connection has not been established.
         """
         if not path:
             raise ValueError("The 'path' parameter is required.")
-        
-        if not os.path.exists(path):
-            os.makedirs(path)  # Create the base directory if it doesn't exist
+        if expand and not (start and end):
+            raise ValueError("The 'start' and 'end' parameters are required to expand recurring events.")
+        if window_days <= 0:
+            raise ValueError("The 'window_days' parameter must be positive.")
 
-        for calendar in self.calendars:
-            calendar_name = calendar.name.replace(" ", "_")  # Replace spaces in calendar names with underscores
-            calendar_path = os.path.join(path, calendar_name)
-            
-            if not os.path.exists(calendar_path) and save_single_events:
-                os.makedirs(calendar_path)  # Create a directory for each calendar if saving single events
-
-            combined_cal = Calendar()  # For combined calendar
-            combined_calendar_path = os.path.join(path, f"{calendar_name}.ics")
-
-            events = calendar.events()  # Fetch all events for the calendar
-            # Use tqdm to show progress
-            for event in tqdm(events, desc=f"Exporting {calendar.name}"):
-                combined_cal.add_component(event.icalendar_component)
-
-                if save_single_events:
-                    uid = str(event.icalendar_component['UID'])
-                    data = event.data
-                    filename = os.path.join(calendar_path, f"{uid}.ics")
-
-                    # Write event data to .ics file
-                    with open(filename, 'w') as ics_file:
-                        ics_file.write(data)
-
-            if save_combined_calendar:
-                # Export the combined .ics file for the calendar
-                with open(combined_calendar_path, 'wb') as ics_file:
-                    ics_file.write(combined_cal.to_ical())
+        os.makedirs(path, exist_ok=True)  # Create the base directory if it doesn't exist
+
+        calendars = self.calendars
+        if not calendars:
+            return
+
+        # Calendars are exported concurrently, so each of them needs its own output files
+        names = self._output_names(calendars)
+
+        cache_path = os.path.join(path, _CACHE_FILENAME)
+        cache = self._load_cache(cache_path)
+
+        # Calendars are exported independently, so handle them concurrently - the work is
+        # dominated by CalDAV round-trips, not by local processing
+        with ThreadPoolExecutor(max_workers=min(self.default_max_workers, len(calendars))) as executor:
+            export_one = functools.partial(self._export_one, path=path, save_single_events=save_single_events,
+                                           save_combined_calendar=save_combined_calendar,
+                                           start=start, end=end, expand=expand, window_days=window_days,
+                                           cache=cache)
+            # Consume the results to re-raise any exception from the worker threads
+            entries = list(executor.map(export_one, calendars, names, range(len(calendars))))
+
+        # The listings are outdated once exported - the next export or summary should see new changes
+        self.refresh()
+        self._save_cache(cache_path, {str(calendar.url): entry for calendar, entry in zip(calendars, entries)})
+
+    @staticmethod
+    def _output_names(calendars: List[caldav.objects.Calendar]) -> List[str]:
+        """
+        Choose the names of the output files of the calendars.
+
+        Calendars are named after their display name, with spaces replaced by underscores. Calendars 
+        sharing a name (ignoring case, for case-insensitive file systems) get the last segment of their 
+        URL appended, so they never write to the same files.
+
+        Raises:
+        -------
+        ValueError:
+            If the names of some calendars cannot be told apart even so.
+        """
+        # Replace spaces in calendar names with underscores
+        names = [calendar.name.replace(" ", "_") for calendar in calendars]
+        counts = Counter(name.casefold() for name in names)
+        for index, calendar in enumerate(calendars):
+            if counts[names[index].casefold()] > 1:
+                segment = str(calendar.url).rstrip("/").rsplit("/", 1)[-1]
+                names[index] = f"{names[index]}_{_UNSAFE_FILENAME_RE.sub('_', segment)}"
+
+        duplicates = [name for name, count in Counter(name.casefold() for name in names).items() if count > 1]
+        if duplicates:
+            raise ValueError(f"Calendars with the same name cannot be exported: {', '.join(duplicates)}")
+        return names
+
+    def _export_one(self, calendar: caldav.objects.Calendar, calendar_name: str, position: int, path: str,
+                    save_single_events: bool, save_combined_calendar: bool,
+                    start: Optional[datetime], end: Optional[datetime], expand: bool, window_days: int,
+                    cache: Dict) -> Dict:
+        """
+        Export the events of a single calendar. See `export` for the meaning of the parameters.
+
+        `calendar_name` is the name of the output files, see `_output_names`. `position` is the line
+        of the tqdm progress bar, so the bars of concurrently exported calendars do not overwrite each
+        other. `cache` holds the state of the previous export.
+
+        Returns:
+        --------
+        Dict:
+            The cache entry of the calendar, describing the exported events.
+        """
+        from tqdm import tqdm  # For progress bar
+
+        calendar_path = os.path.join(path, calendar_name)
+
+        if save_single_events:
+            os.makedirs(calendar_path, exist_ok=True)  # Create a directory for each calendar if saving single events
+
+        combined_calendar_path = os.path.join(path, f"{calendar_name}.ics")
+
+        # Events exported for a different time range or expansion cannot be reused,
+        # but the files of the previous export are still cleaned up
+        scope = {"start": start and _format_utc(start), "end": end and _format_utc(end), "expand": expand}
+        entry = cache.get(str(calendar.url), {})
+        previous = entry.get("events", {})
+        cached = previous if entry.get("scope") == scope else {}
+
+        # The combined calendar may be outdated if a previous export did not write it, or modified locally
+        combined_current = (entry.get("scope") == scope
+                            and self._is_unmodified(entry.get("combined"), combined_calendar_path))
+
+        # Index the exported files with a single directory scan instead of checking them one by one
+        exported_files = self._scan_exported_files(calendar_path) if save_single_events else {}
+
+        # Nothing changed in the calendar since the previous export, if its CTag is still the same -
+        # unless some of the exported files are missing or were modified in the meantime
+        ctag, sync_token = self._fetch_collection_tags(calendar)
+        if (ctag is not None and entry.get("scope") == scope and entry.get("ctag") == ctag
+                and (not save_combined_calendar or combined_current)
+                and (not save_single_events
+                     or all(self._is_exported(event, exported_files) for event in cached.values()))):
+            logger.debug("Calendar %s is unchanged, skipping it.", calendar.name)
+            return entry
+
+        # Without a time range, ask the server for the changes since the previous export only.
+        # If the server rejects the sync token, fall back to listing all events
+        changes = None
+        if not (start or end) and entry.get("scope") == scope and entry.get("sync_token"):
+            changes = self._sync_collection(calendar, entry["sync_token"])
+
+        # Otherwise list the ETags of the events first - they change whenever an event is modified
+        downloaded = {}
+        if changes is not None:
+            sync_token, changed, deleted = changes
+            # The changes also include tasks, which are not exported - download the changed resources
+            # first to tell them apart, so a changed task does not require writing anything
+            downloaded = {href: (etag, data) for href, etag, data in self._multiget_events(calendar, changed)
+                          if _VEVENT_RE.search(data)}
+            etags = {href: event["etag"] for href, event in cached.items()
+                     if href not in deleted and href not in changed}
+            etags.update((href, etag) for href, (etag, data) in downloaded.items())
+        elif start or end:
+            etags = self._fetch_etags(calendar, start, end, window_days)
+        else:
+            etags = self._events_of(calendar, ctag)
+        unchanged = {href: cached[href] for href, etag in etags.items()
+                     if etag and href in cached and cached[href]["etag"] == etag}
+        removed = previous.keys() - etags.keys()
+        modified = len(unchanged) < len(etags) or bool(removed)
+
+        # Remove the files of events which were deleted on the server
+        for href in removed:
+            self._remove_event_file(calendar_path, previous[href])
+
+        # Events to download: single event files are needed for all new, changed or missing events.
+        # The combined calendar is rebuilt from the unchanged events of the previous one, if it is current
+        write_combined = save_combined_calendar and (modified or not combined_current)
+        if save_single_events:
+            needed = {href for href in etags
+                      if href not in unchanged or not self._is_exported(unchanged[href], exported_files)}
+        elif write_combined:
+            needed = {href for href in etags
+                      if not (combined_current and href in unchanged and "range" in unchanged[href])}
+        else:
+            needed = set()
+
+        # The events are downloaded in batches while they are written, not all at once
+        remaining = needed - downloaded.keys()
+        if not remaining:
+            fetched = iter(())
+        elif remaining == etags.keys():
+            fetched = self._fetch_events(calendar, start, end, expand, window_days)
+        else:
+            fetched = self._multiget_events(calendar, remaining, start, end, expand)
+        fetched = itertools.chain(((href, etag, data) for href, (etag, data) in downloaded.items() if href in needed),
+                                  fetched)
+
+        # Use tqdm to show progress (tqdm serializes the output of concurrent bars with its own lock).
+        # The progress bar is only useful on a terminal - when run non-interactively, skip its overhead
+        progress = tqdm(fetched, desc=f"Exporting {calendar.name}", total=len(needed), position=position,
+                        disable=not sys.stderr.isatty(), mininterval=0.5)
+
+        # Select the loop for the requested outputs once, so each loop only does the work it needs
+        events = dict(unchanged)
+        previous_combined_path = combined_calendar_path if combined_current else None
+        if save_single_events and write_combined:
+            with self._open_combined(combined_calendar_path) as combined_file:
+                # The downloaded data is reused - events with missing or modified files are downloaded again
+                self._write_unchanged_vevents(combined_file, unchanged, needed, events, calendar_path,
+                                              previous_combined_path)
+                for href, etag, data in progress:
+                    events[href] = self._write_single_event(calendar_path, etag, data, previous.get(href))
+                    events[href]["range"] = self._write_vevents(combined_file, data)
+        elif save_single_events:
+            for href, etag, data in progress:
+                events[href] = self._write_single_event(calendar_path, etag, data, previous.get(href))
+        elif write_combined:
+            with self._open_combined(combined_calendar_path) as combined_file:
+                self._write_unchanged_vevents(combined_file, unchanged, needed, events, calendar_path,
+                                              previous_combined_path)
+                for href, etag, data in progress:
+                    events[href] = {"etag": etag, "range": self._write_vevents(combined_file, data)}
+
+        # Remember the state of the combined calendar, to tell whether it can be reused next time
+        if write_combined:
+            stat = os.stat(combined_calendar_path)
+            combined = {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+        elif combined_current and not modified:
+            combined = entry["combined"]
+        else:
+            combined = None
+
+        logger.debug("Exported calendar %s: %d events downloaded, %d unchanged, %d removed.",
+                     calendar.name, len(events) - len(unchanged), len(unchanged), len(removed))
+        return {"scope": scope, "ctag": ctag, "sync_token": sync_token, "combined": combined, "events": events}
 
+    @staticmethod
+    @contextlib.contextmanager
+    def _open_combined(combined_calendar_path: str) -> Iterator[BinaryIO]:
+        """
+        Open the combined .ics file of a calendar for streaming its events with `_write_vevents`.
+        The calendar header and footer are written when the file is opened and closed.
+
+        The events are streamed into a temporary file, which replaces the combined .ics file only
+        when all events were written - if the export fails halfway, the previous file is kept.
+        """
+        temporary_path = f"{combined_calendar_path}.tmp"
+        try:
+            with open(temporary_path, 'wb') as ics_file:
+                ics_file.write(_COMBINED_HEADER)
+                yield ics_file
+                ics_file.write(_COMBINED_FOOTER)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+        os.replace(temporary_path, combined_calendar_path)
+
+    @staticmethod
+    def _write_vevents(ics_file: BinaryIO, data: bytes) -> List[int]:
+        """
+        Append the VEVENT blocks of the iCalendar data of an event to a combined .ics file.
+
+        The blocks are copied from the data straight into the file, so the events are neither
+        parsed nor held in memory all at once.
+
+        Returns:
+        --------
+        List[int]:
+            The offset and the length of the written blocks in the file.
+        """
+        offset = ics_file.tell()
+        for match in _VEVENT_RE.finditer(data):
+            # Use the CRLF line breaks required by iCalendar, whatever the server sent
+            ics_file.write(match.group().replace(b"\r\n", b"\n").replace(b"\n", b"\r\n"))
+        return [offset, ics_file.tell() - offset]
+
+    def _write_unchanged_vevents(self, ics_file: BinaryIO, unchanged: Dict[str, Dict], needed: Set[str],
+                                 events: Dict[str, Dict], calendar_path: str,
+                                 previous_combined_path: Optional[str]) -> None:
+        """
+        Write the VEVENT blocks of the unchanged events which are not downloaded again to a combined .ics file.
+
+        The blocks are copied from the previous combined calendar `previous_combined_path` where their 
+        position there is known, and read from the single event files otherwise. Their positions in the 
+        new file are recorded in the entries of `events`.
+        """
+        with (open(previous_combined_path, 'rb') if previous_combined_path
+              else contextlib.nullcontext()) as previous_file:
+            for href, event in unchanged.items():
+                if href in needed:
+                    continue
+                if previous_file is not None and "range" in event:
+                    offset, length = event["range"]
+                    previous_file.seek(offset)
+                    events[href] = dict(event, range=[ics_file.tell(), length])
+                    ics_file.write(previous_file.read(length))
+                else:
+                    data = self._read_event_file(calendar_path, event)
+                    events[href] = dict(event, range=self._write_vevents(ics_file, data))
+
+    def _write_single_event(self, calendar_path: str, etag: str, data: bytes,
+                            previous_event: Optional[Dict]) -> Dict:
+        """
+        Write the single event file of a downloaded event.
+
+        Returns:
+        --------
+        Dict:
+            The cache entry of the event.
+        """
+        uid = _event_uid(data)
+        filename = _event_filename(uid)
+
+        # Write event data to .ics file
+        stat = self._write_event_file(os.path.join(calendar_path, filename), data)
+
+        # The UID of an event resource is not supposed to change, but do not leave stale files behind
+        if previous_event and previous_event.get("file") not in (None, filename):
+            self._remove_event_file(calendar_path, previous_event)
+
+        # Earlier versions named the files after the unsanitized UID, remove these duplicates
+        legacy_filename = f"{uid}.ics"
+        if legacy_filename != filename and os.path.basename(legacy_filename) == legacy_filename:
+            self._remove_event_file(calendar_path, {"file": legacy_filename})
+        return {"etag": etag, "file": filename, "size": stat.st_size, "mtime": stat.st_mtime_ns}
+
+    @staticmethod
+    def _write_event_file(filename: str, data: bytes) -> os.stat_result:
+        """
+        Write the data of a single event file.
+
+        Uses unbuffered OS-level I/O - the data is written at once, so Python's buffered
+        text I/O would only add overhead for every one of the many small files.
+
+        Returns:
+        --------
+        os.stat_result:
+            The status of the written file.
+        """
+        fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            return os.fstat(fd)
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _is_unmodified(state: Optional[Dict], filename: str) -> bool:
+        """
+        Check whether a file is still as recorded in `state` by the export which wrote it.
+        """
+        try:
+            stat = os.stat(filename)
+        except FileNotFoundError:
+            return False
+        return bool(state) and stat.st_size == state.get("size") and stat.st_mtime_ns == state.get("mtime")
+
+    @staticmethod
+    def _scan_exported_files(calendar_path: str) -> Dict[str, os.stat_result]:
+        """
+        List the files in the directory of the single event files of a calendar.
+
+        Returns:
+        --------
+        Dict[str, os.stat_result]:
+            The status of the files, by name.
+        """
+        with os.scandir(calendar_path) as entries:
+            return {entry.name: entry.stat() for entry in entries}
+
+    @staticmethod
+    def _is_exported(event: Dict, exported_files: Dict[str, os.stat_result]) -> bool:
+        """
+        Check whether the single event file of an event is still as it was written by the previous export.
+        """
+        stat = exported_files.get(event.get("file"))
+        return stat is not None and stat.st_size == event.get("size") and stat.st_mtime_ns == event.get("mtime")
+
+    @staticmethod
+    def _read_event_file(calendar_path: str, event: Dict) -> bytes:
+        """
+        Read the data of an exported single event file.
+        """
+        with open(os.path.join(calendar_path, event["file"]), 'rb') as ics_file:
+            return ics_file.read()
+
+    @staticmethod
+    def _remove_event_file(calendar_path: str, event: Dict) -> None:
+        """
+        Remove the exported single event file of an event, if there is one.
+        """
+        if event.get("file"):
+            try:
+                os.remove(os.path.join(calendar_path, event["file"]))
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _load_cache(cache_path: str) -> Dict:
+        """
+        Load the state of the previous export. A missing or unreadable cache file means a full export.
+        """
+        try:
+            with open(cache_path) as cache_file:
+                return json.load(cache_file)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _save_cache(cache_path: str, cache: Dict) -> None:
+        """
+        Save the state of the export, replacing the cache file atomically.
+        """
+        with open(f"{cache_path}.tmp", 'w') as cache_file:
+            json.dump(cache, cache_file)
+        os.replace(f"{cache_path}.tmp", cache_path)
+
+    def _report(self, calendar: caldav.objects.Calendar, body: str, depth: Optional[int] = 1) -> Iterator:
+        """
+        Send a REPORT request to the calendar and iterate over the `response` elements of the multistatus.
+
+        Raises:
+        -------
+        ReportError:
+            If the server rejects the REPORT.
+        """
+        headers = {"Content-Type": 'application/xml; charset="utf-8"'}
+        if depth is not None:
+            headers["Depth"] = str(depth)
+        response = self.client.request(str(calendar.url), "REPORT", body, headers)
+        if response.status >= 400 or response.tree is None:
+            raise ReportError(url=str(calendar.url), reason=f"HTTP status {response.status}")
+        return response.tree.iter(f"{{{_DAV_NS}}}response")
+
+    def _fetch_collection_tags(self, calendar: caldav.objects.Calendar) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Get the CTag and the sync token of the calendar with a single PROPFIND request.
+
+        Returns:
+        --------
+        Tuple[Optional[str], Optional[str]]:
+            The CTag and the sync token, each `None` if the server does not provide it.
+        """
+        response = self.client.propfind(str(calendar.url), _COLLECTION_PROPFIND_XML, depth=0)
+        if response.status >= 400 or response.tree is None:
+            return None, None
+        return (response.tree.findtext(f".//{{{_CALENDARSERVER_NS}}}getctag") or None,
+                response.tree.findtext(f".//{{{_DAV_NS}}}sync-token") or None)
+
+    def _sync_collection(self, calendar: caldav.objects.Calendar,
+                         sync_token: str) -> Optional[Tuple[str, Dict[str, str], Set[str]]]:
+        """
+        List the resources of the calendar which changed since `sync_token` with a `sync-collection` REPORT.
+
+        Returns:
+        --------
+        Optional[Tuple[str, Dict[str, str], Set[str]]]:
+            The new sync token, the ETags of the added or modified resources by href, and the hrefs of 
+            the removed resources - or `None` if the server rejects the token or truncates the changes, 
+            in which case all events have to be listed instead.
+        """
+        headers = {"Content-Type": 'application/xml; charset="utf-8"', "Depth": "0"}
+        body = _SYNC_COLLECTION_XML.format(sync_token=escape(sync_token))
+        try:
+            response = self.client.request(str(calendar.url), "REPORT", body, headers)
+        except AuthorizationError:
+            # An invalid or expired token fails the DAV:valid-sync-token precondition with 403 Forbidden
+            return None
+        if response.status >= 400 or response.tree is None:
+            return None
+        new_sync_token = response.tree.findtext(f"{{{_DAV_NS}}}sync-token")
+        if not new_sync_token:
+            return None
+
+        changed, deleted = {}, set()
+        for item in response.tree.iter(f"{{{_DAV_NS}}}response"):
+            href = item.findtext(f"{{{_DAV_NS}}}href")
+            status = (item.findtext(f"{{{_DAV_NS}}}status") or "").split()
+            code = status[1] if len(status) > 1 else None
+            if code == "507":
+                # The server reported only part of the changes
+                return None
+            if code == "404":
+                deleted.add(href)
+            elif href:
+                changed[href] = item.findtext(f".//{{{_DAV_NS}}}getetag")
+        return new_sync_token, changed, deleted
+
+    def _calendar_query(self, calendar: caldav.objects.Calendar, props: str, start: Optional[datetime],
+                        end: Optional[datetime], window_days: Optional[int] = None) -> Iterator:
+        """
+        Send a `calendar-query` REPORT for the events of the calendar, optionally limited to a time range.
+
+        If both `start` and `end` are given, the time range is queried in windows of `window_days` days,
+        one REPORT each, so only a single window's response is held in memory at a time. Events 
+        overlapping several windows are returned only once.
+        """
+        if not (start and end and window_days):
+            time_range = f"<C:time-range{_time_range_attributes(start, end)}/>" if start or end else ""
+            yield from self._report(calendar, _CALENDAR_QUERY_XML.format(props=props, time_range=time_range))
+            return
+
+        hrefs = set()
+        for window_start, window_end in _time_windows(start, end, window_days):
+            time_range = f"<C:time-range{_time_range_attributes(window_start, window_end)}/>"
+            for response in self._report(calendar, _CALENDAR_QUERY_XML.format(props=props, time_range=time_range)):
+                href = response.findtext(f"{{{_DAV_NS}}}href")
+                if href not in hrefs:
+                    hrefs.add(href)
+                    yield response
+
+    def _fetch_etags(self, calendar: caldav.objects.Calendar, start: Optional[datetime] = None,
+                     end: Optional[datetime] = None, window_days: Optional[int] = None) -> Dict[str, str]:
+        """
+        List the events of the calendar with their ETags, without downloading their data.
+
+        Returns:
+        --------
+        Dict[str, str]:
+            The ETags of the event resources, by href.
+        """
+        etags = {}
+        for response in self._calendar_query(calendar, "<D:getetag/>", start, end, window_days):
+            href = response.findtext(f"{{{_DAV_NS}}}href")
+            if href:
+                etags[href] = response.findtext(f".//{{{_DAV_NS}}}getetag")
+        return etags
+
+    def _fetch_components(self, calendar: caldav.objects.Calendar) -> Dict[str, Dict[str, str]]:
+        """
+        List the events and tasks of the calendar with their ETags, using a single REPORT.
+
+        Returns:
+        --------
+        Dict[str, Dict[str, str]]:
+            The ETags of the event ("VEVENT") and task ("VTODO") resources, by href.
+        """
+        components = {"VEVENT": {}, "VTODO": {}}
+        for href, etag, data in self._parse_events(self._report(calendar, _COMPONENTS_QUERY_XML)):
+            match = _COMPONENT_RE.search(data)
+            if match:
+                components[match.group(1).decode()][href] = etag
+        return components
+
+    def _fetch_events(self, calendar: caldav.objects.Calendar, start: Optional[datetime] = None,
+                      end: Optional[datetime] = None, expand: bool = False,
+                      window_days: Optional[int] = None) -> Iterator[Tuple[str, str, bytes]]:
+        """
+        Fetch the data of all events of the calendar.
+
+        A single `calendar-query` REPORT (or one per time window, see `_calendar_query`) returns the 
+        data of all events at once, instead of fetching every event with its own GET request. With 
+        `expand`, the server returns the instances of recurring events between `start` and `end` 
+        instead of their rules. Expanded events are never queried in time windows - servers may only 
+        return the instances within the window, and an event overlapping several windows is only 
+        taken from the first of them.
+
+        Yields:
+        -------
+        Tuple[str, str, bytes]:
+            The href of the event resource, its ETag and its iCalendar data.
+        """
+        props = f"<D:getetag/>{_calendar_data_xml(start, end, expand)}"
+        return self._parse_events(self._calendar_query(calendar, props, start, end,
+                                                       None if expand else window_days))
+
+    def _multiget_events(self, calendar: caldav.objects.Calendar, hrefs: Iterable[str],
+                         start: Optional[datetime] = None, end: Optional[datetime] = None,
+                         expand: bool = False) -> Iterator[Tuple[str, str, bytes]]:
+        """
+        Fetch the data of the given events of the calendar with `calendar-multiget` REPORTs, each 
+        requesting up to `default_multiget_size` events. `start`, `end` and `expand` control the 
+        expansion of recurring events as in `_fetch_events`.
+
+        Yields:
+        -------
+        Tuple[str, str, bytes]:
+            The href of the event resource, its ETag and its iCalendar data.
+        """
+        hrefs = list(hrefs)
+        calendar_data = _calendar_data_xml(start, end, expand)
+        for index in range(0, len(hrefs), self.default_multiget_size):
+            batch = "".join(f"<D:href>{escape(href)}</D:href>"
+                            for href in hrefs[index:index + self.default_multiget_size])
+            # The Depth header is not used by calendar-multiget
+            body = _CALENDAR_MULTIGET_XML.format(calendar_data=calendar_data, hrefs=batch)
+            yield from self._parse_events(self._report(calendar, body, depth=None))
+
+    @staticmethod
+    def _parse_events(responses: Iterable) -> Iterator[Tuple[str, str, bytes]]:
+        """
+        Extract the href, ETag and iCalendar data of the events from the `response` elements of a multistatus.
+
+        The data is encoded once here - the single event files and the combined calendar are
+        both written from the same bytes.
+        """
+        for response in responses:
+            href = response.findtext(f"{{{_DAV_NS}}}href")
+            etag = response.findtext(f".//{{{_DAV_NS}}}getetag")
+            data = response.findtext(f".//{{{_CALDAV_NS}}}calendar-data")
+            if href and data:
+                yield href, etag, data.encode('utf-8')
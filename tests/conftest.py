@@ -0,0 +1,211 @@
+import re
+import types
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
+from xml.sax.saxutils import escape, unescape
+
+import pytest
+from caldav.lib.error import AuthorizationError
+
+from gromex import GrommunioCalendars
+
+
+def make_ics(uid: str, summary: str, component: str = "VEVENT", starts: list = None) -> str:
+    """
+    Build the iCalendar data of a single event or task. An event with several `starts` recurs monthly.
+    """
+    starts = starts or ["20240101T100000Z"]
+    rrule = f"RRULE:FREQ=MONTHLY;COUNT={len(starts)}\r\n" if len(starts) > 1 else ""
+    return ("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//test//EN\r\n"
+            f"BEGIN:{component}\r\nUID:{uid}\r\nDTSTAMP:20240101T000000Z\r\n"
+            f"DTSTART:{starts[0]}\r\n{rrule}SUMMARY:{summary}\r\nEND:{component}\r\n"
+            "END:VCALENDAR\r\n")
+
+
+def _range(body: str, element: str) -> tuple:
+    """
+    The start and end attributes of the first `element` of a request body, if there is one.
+    """
+    match = re.search(rf"<C:{element}([^>]*)/>", body)
+    if not match:
+        return None
+    attributes = dict(re.findall(r'(start|end)="([^"]*)"', match.group(1)))
+    return attributes.get("start", ""), attributes.get("end", "99991231T000000Z")
+
+
+def _in_range(start: str, time_range: tuple) -> bool:
+    """
+    Whether an instance of one hour starting at `start` overlaps the time range.
+    """
+    end = (datetime.strptime(start, "%Y%m%dT%H%M%SZ") + timedelta(hours=1)).strftime("%Y%m%dT%H%M%SZ")
+    return time_range is None or (start < time_range[1] and end > time_range[0])
+
+
+class FakeResponse:
+    def __init__(self, status: int, body: str = None):
+        self.status = status
+        self.tree = ET.fromstring(body) if body else None
+
+
+class FakeCalDAVServer:
+    """
+    A minimal in-memory CalDAV server, standing in for the `caldav.DAVClient` of `GrommunioCalendars`.
+
+    It answers the PROPFIND and REPORT requests sent by `export` and `show_summary`, and records
+    the kind of every request in `requests` and the number of events requested by every
+    calendar-multiget in `multiget_sizes`. Without `sync`, the server provides no sync tokens.
+
+    Time ranges are simplified: events last one hour and recurring events have their instances
+    listed explicitly. Like Radicale, a calendar-query with both a time range filter and `expand`
+    only returns the instances inside the filter.
+    """
+
+    def __init__(self):
+        self.calendars = []
+        self.requests = []
+        self.multiget_sizes = []
+        self.sync = True
+        self._collections = {}
+        self._failures = {}
+
+    def fail(self, kind: str, after: int = 0) -> None:
+        """
+        Let the requests of the given kind fail with a `ConnectionError` after `after` successful ones.
+        """
+        self._failures[kind] = after
+
+    def _record(self, kind: str) -> None:
+        if kind in self._failures:
+            if not self._failures[kind]:
+                raise ConnectionError(f"{kind} failed")
+            self._failures[kind] -= 1
+        self.requests.append(kind)
+
+    def add_calendar(self, name: str, url: str = None) -> types.SimpleNamespace:
+        url = url or f"/calendars/john/{name.lower().replace(' ', '-')}/"
+        calendar = types.SimpleNamespace(url=url, name=name,
+                                         get_supported_components=lambda: ["VEVENT", "VTODO"])
+        self.calendars.append(calendar)
+        self._collections[url] = {"resources": {}, "changes": {}, "version": 0}
+        return calendar
+
+    def put(self, calendar, uid: str, summary: str = None, component: str = "VEVENT",
+            starts: list = None, data: str = None) -> str:
+        """
+        Add or modify an event (or task) on the server, returning its href.
+
+        The iCalendar data is built from the other arguments, unless it is given as `data`.
+        """
+        collection = self._collections[calendar.url]
+        collection["version"] += 1
+        href = f"{calendar.url}{uid}.ics"
+        collection["resources"][href] = {
+            "etag": f'"{uid}-{collection["version"]}"',
+            "data": data or make_ics(uid, summary, component, starts),
+            "uid": uid, "summary": summary, "component": component,
+            "starts": starts or ["20240101T100000Z"],
+        }
+        collection["changes"][href] = collection["version"]
+        return href
+
+    def delete(self, calendar, href: str) -> None:
+        collection = self._collections[calendar.url]
+        collection["version"] += 1
+        del collection["resources"][href]
+        collection["changes"][href] = collection["version"]
+
+    def propfind(self, url: str, body: str, depth: int = 0) -> FakeResponse:
+        self._record("PROPFIND")
+        version = self._collections[url]["version"]
+        sync_token = f"<D:sync-token>urn:fake:{version}</D:sync-token>" if self.sync else ""
+        return FakeResponse(207, f"""<D:multistatus xmlns:D="DAV:" xmlns:CS="http://calendarserver.org/ns/">
+            <D:response><D:href>{url}</D:href><D:propstat><D:prop>
+              <CS:getctag>"ctag-{version}"</CS:getctag>{sync_token}
+            </D:prop><D:status>HTTP/1.1 200 OK</D:status></D:propstat></D:response>
+            </D:multistatus>""")
+
+    def request(self, url: str, method: str = "GET", body: str = "", headers: dict = None) -> FakeResponse:
+        collection = self._collections[url]
+        resources = collection["resources"]
+        if "sync-collection" in body:
+            self._record("sync-collection")
+            match = re.search(r"<D:sync-token>urn:fake:(\d+)</D:sync-token>", body)
+            if not match or int(match.group(1)) > collection["version"]:
+                # caldav raises this for the 403 of the DAV:valid-sync-token precondition
+                raise AuthorizationError(url=url, reason="Forbidden")
+            since = int(match.group(1))
+            items = []
+            for href, version in collection["changes"].items():
+                if version <= since:
+                    continue
+                if href in resources:
+                    items.append(self._response(href, resources[href]["etag"]))
+                else:
+                    items.append(f"<D:response><D:href>{escape(href)}</D:href>"
+                                 "<D:status>HTTP/1.1 404 Not Found</D:status></D:response>")
+            return self._multistatus(items, f"<D:sync-token>urn:fake:{collection['version']}</D:sync-token>")
+
+        time_range = None
+        if "calendar-multiget" in body:
+            self._record("calendar-multiget")
+            hrefs = [unescape(href) for href in re.findall(r"<D:href>(.*?)</D:href>", body)]
+            self.multiget_sizes.append(len(hrefs))
+        else:
+            self._record("calendar-query")
+            events_only = '<C:comp-filter name="VEVENT">' in body
+            time_range = _range(body, "time-range")
+            hrefs = [href for href, resource in resources.items()
+                     if not events_only or "BEGIN:VEVENT" in resource["data"]
+                     if any(_in_range(start, time_range) for start in resource["starts"])]
+        return self._multistatus([self._response(href, resources[href]["etag"],
+                                                 self._calendar_data(resources[href], body, time_range))
+                                  for href in hrefs if href in resources])
+
+    @staticmethod
+    def _calendar_data(resource: dict, body: str, time_range: tuple) -> str:
+        """
+        The calendar data of a resource as requested by the `calendar-data` element of the body.
+        """
+        if "calendar-data" not in body:
+            return None
+        if "<C:comp " in body:
+            # Partial calendar data, limited to the UID
+            return (f"BEGIN:VCALENDAR\r\nBEGIN:{resource['component']}\r\nUID:{resource['uid']}\r\n"
+                    f"END:{resource['component']}\r\nEND:VCALENDAR\r\n")
+        expand = _range(body, "expand")
+        if not expand or len(resource["starts"]) == 1:
+            return resource["data"]
+        instances = "".join(f"BEGIN:VEVENT\r\nUID:{resource['uid']}\r\nRECURRENCE-ID:{start}\r\n"
+                            f"DTSTART:{start}\r\nSUMMARY:{resource['summary']}\r\nEND:VEVENT\r\n"
+                            for start in resource["starts"]
+                            if _in_range(start, expand) and _in_range(start, time_range))
+        return f"BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//test//EN\r\n{instances}END:VCALENDAR\r\n"
+
+    @staticmethod
+    def _response(href: str, etag: str, data: str = None) -> str:
+        calendar_data = f"<C:calendar-data>{escape(data)}</C:calendar-data>" if data is not None else ""
+        return (f"<D:response><D:href>{escape(href)}</D:href><D:propstat><D:prop>"
+                f"<D:getetag>{escape(etag)}</D:getetag>{calendar_data}"
+                "</D:prop><D:status>HTTP/1.1 200 OK</D:status></D:propstat></D:response>")
+
+    @staticmethod
+    def _multistatus(items: list, extra: str = "") -> FakeResponse:
+        return FakeResponse(207, '<D:multistatus xmlns:D="DAV:" xmlns:C="urn:ietf:params:xml:ns:caldav">'
+                                 f"{''.join(items)}{extra}</D:multistatus>")
+
+
+@pytest.fixture
+def server() -> FakeCalDAVServer:
+    return FakeCalDAVServer()
+
+
+@pytest.fixture
+def grommunio(server: FakeCalDAVServer) -> GrommunioCalendars:
+    """
+    A `GrommunioCalendars` instance connected to the fake server.
+    """
+    grommunio = GrommunioCalendars(username="john", password="secret", autoconnect=False)
+    grommunio.client = server
+    grommunio.principal = object()  # Pretend to be connected
+    grommunio._calendars = server.calendars
+    return grommunio
@@ -0,0 +1,27 @@
+import subprocess
+import sys
+
+import pytest
+
+
+def _loaded_modules(code: str) -> set:
+    """
+    Run `code` in a fresh interpreter and return the names of the modules it loaded, which are
+    printed to stderr apart from any output of the code.
+    """
+    result = subprocess.run([sys.executable, "-c", f"{code}\nimport sys\nprint(' '.join(sys.modules), file=sys.stderr)"],
+                            capture_output=True, text=True, check=True)
+    return set(result.stderr.split())
+
+
+def test_import_does_not_load_caldav():
+    modules = _loaded_modules("import gromex")
+    assert "caldav" not in modules and "tqdm" not in modules
+
+
+@pytest.mark.parametrize("option", ["--help", "--version"])
+def test_help_does_not_load_caldav(option):
+    code = ("import sys\nfrom gromex.gromex_cli import main\n"
+            f"sys.argv = ['gromex', '{option}']\n"
+            "try:\n    main()\nexcept SystemExit:\n    pass")
+    assert "caldav" not in _loaded_modules(code)
@@ -0,0 +1,269 @@
+import json
+import os
+import re
+
+import pytest
+
+
+MODES = {
+    "combined": {"save_single_events": False, "save_combined_calendar": True},
+    "both": {"save_single_events": True, "save_combined_calendar": True},
+    "single": {"save_single_events": True, "save_combined_calendar": False},
+}
+
+
+def combined_summaries(path: str) -> list:
+    """
+    The summaries of the events in a combined .ics file, in file order.
+    """
+    with open(path, 'rb') as ics_file:
+        data = ics_file.read()
+    assert data.count(b"BEGIN:VEVENT") == data.count(b"END:VEVENT")
+    return re.findall(r"^SUMMARY:(.*?)\r$", data.decode(), re.M)
+
+
+def exported_state(path: str) -> dict:
+    """
+    The exported events of all calendars in `path`: the sorted summaries of the combined files
+    and the names of the single event files.
+    """
+    state = {}
+    for name in sorted(os.listdir(path)):
+        full_path = os.path.join(path, name)
+        if name.endswith(".ics"):
+            state[name] = sorted(combined_summaries(full_path))
+        elif os.path.isdir(full_path):
+            state[name] = sorted(os.listdir(full_path))
+    return state
+
+
+@pytest.fixture
+def calendar(server):
+    calendar = server.add_calendar("Work Cal")
+    for index in range(3):
+        server.put(calendar, f"event-{index}", f"Event {index}")
+    server.put(calendar, "task-0", "Task 0", component="VTODO")
+    return calendar
+
+
+def test_first_export(grommunio, calendar, tmp_path):
+    grommunio.export(str(tmp_path), save_single_events=True)
+
+    assert sorted(combined_summaries(tmp_path / "Work_Cal.ics")) == ["Event 0", "Event 1", "Event 2"]
+    assert sorted(os.listdir(tmp_path / "Work_Cal")) == ["event-0.ics", "event-1.ics", "event-2.ics"]
+    assert (tmp_path / ".gromex_cache.json").exists()
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_unchanged_export_only_checks_ctag(grommunio, server, calendar, tmp_path, mode):
+    mode = MODES[mode]
+    grommunio.export(str(tmp_path), **mode)
+    state = exported_state(str(tmp_path))
+
+    server.requests.clear()
+    grommunio.export(str(tmp_path), **mode)
+
+    assert server.requests == ["PROPFIND"]
+    assert exported_state(str(tmp_path)) == state
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_server_changes(grommunio, server, calendar, tmp_path, mode):
+    mode = MODES[mode]
+    grommunio.export(str(tmp_path / "incremental"), **mode)
+
+    server.put(calendar, "event-0", "Event 0 modified")
+    server.delete(calendar, f"{calendar.url}event-1.ics")
+    server.put(calendar, "event-3", "Event 3")
+    grommunio.export(str(tmp_path / "incremental"), **mode)
+    grommunio.export(str(tmp_path / "fresh"), **mode)
+
+    assert exported_state(str(tmp_path / "incremental")) == exported_state(str(tmp_path / "fresh"))
+    if mode["save_combined_calendar"]:
+        assert (sorted(combined_summaries(tmp_path / "incremental" / "Work_Cal.ics"))
+                == ["Event 0 modified", "Event 2", "Event 3"])
+
+
+def test_combined_calendar_not_updated_by_single_export(grommunio, server, calendar, tmp_path):
+    grommunio.export(str(tmp_path))
+    server.put(calendar, "event-3", "Event 3")
+    grommunio.export(str(tmp_path), save_single_events=True, save_combined_calendar=False)
+    grommunio.export(str(tmp_path))
+
+    assert sorted(combined_summaries(tmp_path / "Work_Cal.ics")) == ["Event 0", "Event 1", "Event 2", "Event 3"]
+
+
+def test_deleted_single_file_with_server_change(grommunio, server, calendar, tmp_path):
+    grommunio.export(str(tmp_path), save_single_events=True)
+    os.remove(tmp_path / "Work_Cal" / "event-0.ics")
+    server.put(calendar, "event-3", "Event 3")
+    grommunio.export(str(tmp_path), save_single_events=True)
+
+    assert sorted(combined_summaries(tmp_path / "Work_Cal.ics")) == ["Event 0", "Event 1", "Event 2", "Event 3"]
+    assert sorted(os.listdir(tmp_path / "Work_Cal")) == ["event-0.ics", "event-1.ics", "event-2.ics", "event-3.ics"]
+
+
+@pytest.mark.parametrize("edit", ["touch", "modify"])
+def test_edited_single_file_with_server_change(grommunio, server, calendar, tmp_path, edit):
+    grommunio.export(str(tmp_path), save_single_events=True)
+    filename = tmp_path / "Work_Cal" / "event-0.ics"
+    if edit == "touch":
+        os.utime(filename, ns=(0, 0))
+    else:
+        filename.write_bytes(filename.read_bytes().replace(b"Event 0", b"Edited locally"))
+    server.put(calendar, "event-3", "Event 3")
+    grommunio.export(str(tmp_path), save_single_events=True)
+
+    assert sorted(combined_summaries(tmp_path / "Work_Cal.ics")) == ["Event 0", "Event 1", "Event 2", "Event 3"]
+    assert b"SUMMARY:Event 0" in filename.read_bytes()
+
+
+def test_single_events_after_combined_only_export(grommunio, server, calendar, tmp_path):
+    grommunio.export(str(tmp_path))
+    server.put(calendar, "event-3", "Event 3")
+    grommunio.export(str(tmp_path), save_single_events=True)
+
+    assert sorted(combined_summaries(tmp_path / "Work_Cal.ics")) == ["Event 0", "Event 1", "Event 2", "Event 3"]
+    assert sorted(os.listdir(tmp_path / "Work_Cal")) == ["event-0.ics", "event-1.ics", "event-2.ics", "event-3.ics"]
+
+
+@pytest.mark.parametrize("first, second", [(first, second) for first in MODES for second in MODES if first != second])
+def test_toggle_outputs(grommunio, server, calendar, tmp_path, first, second):
+    grommunio.export(str(tmp_path / "incremental"), **MODES[first])
+    server.put(calendar, "event-3", "Event 3")
+    grommunio.export(str(tmp_path / "incremental"), **MODES[second])
+    grommunio.export(str(tmp_path / "fresh"), **MODES[second])
+
+    incremental = exported_state(str(tmp_path / "incremental"))
+    fresh = exported_state(str(tmp_path / "fresh"))
+    # Outputs which are no longer requested are left as they are
+    assert {name: incremental[name] for name in fresh} == fresh
+
+
+@pytest.mark.parametrize("mode", ["both", "single"])
+def test_deleted_single_file_without_server_change(grommunio, server, calendar, tmp_path, mode):
+    grommunio.export(str(tmp_path), **MODES[mode])
+    os.remove(tmp_path / "Work_Cal" / "event-1.ics")
+    server.requests.clear()
+    grommunio.export(str(tmp_path), **MODES[mode])
+
+    assert sorted(os.listdir(tmp_path / "Work_Cal")) == ["event-0.ics", "event-1.ics", "event-2.ics"]
+    assert "calendar-multiget" in server.requests
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_task_change_only_syncs(grommunio, server, calendar, tmp_path, mode):
+    grommunio.export(str(tmp_path), **MODES[mode])
+    state = exported_state(str(tmp_path))
+    server.put(calendar, "task-0", "Task 0 modified", component="VTODO")
+    server.put(calendar, "task-1", "Task 1", component="VTODO")
+    server.requests.clear()
+    grommunio.export(str(tmp_path), **MODES[mode])
+
+    assert server.requests == ["PROPFIND", "sync-collection", "calendar-multiget"]
+    assert exported_state(str(tmp_path)) == state
+
+
+def test_event_change_in_single_events_syncs(grommunio, server, calendar, tmp_path):
+    grommunio.export(str(tmp_path), **MODES["single"])
+    server.put(calendar, "event-0", "Event 0 modified")
+    server.requests.clear()
+    grommunio.export(str(tmp_path), **MODES["single"])
+
+    assert server.requests == ["PROPFIND", "sync-collection", "calendar-multiget"]
+    assert b"SUMMARY:Event 0 modified" in (tmp_path / "Work_Cal" / "event-0.ics").read_bytes()
+
+
+def test_invalid_sync_token_falls_back_to_listing(grommunio, server, calendar, tmp_path):
+    grommunio.export(str(tmp_path / "incremental"), save_single_events=True)
+    cache_path = tmp_path / "incremental" / ".gromex_cache.json"
+    cache = json.loads(cache_path.read_text())
+    cache[calendar.url]["sync_token"] = "urn:fake:999"
+    cache_path.write_text(json.dumps(cache))
+    server.put(calendar, "event-0", "Event 0 modified")
+    server.delete(calendar, f"{calendar.url}event-1.ics")
+    server.requests.clear()
+    grommunio.export(str(tmp_path / "incremental"), save_single_events=True)
+    grommunio.export(str(tmp_path / "fresh"), save_single_events=True)
+
+    assert server.requests[:3] == ["PROPFIND", "sync-collection", "calendar-query"]
+    assert exported_state(str(tmp_path / "incremental")) == exported_state(str(tmp_path / "fresh"))
+
+
+def test_calendars_with_the_same_name(grommunio, server, tmp_path):
+    first = server.add_calendar("Work Cal", url="/calendars/john/first/")
+    second = server.add_calendar("Work Cal", url="/calendars/john/second/")
+    server.put(first, "event-0", "First")
+    server.put(second, "event-1", "Second")
+    grommunio.export(str(tmp_path), save_single_events=True)
+
+    assert combined_summaries(tmp_path / "Work_Cal_first.ics") == ["First"]
+    assert combined_summaries(tmp_path / "Work_Cal_second.ics") == ["Second"]
+    assert os.listdir(tmp_path / "Work_Cal_first") == ["event-0.ics"]
+    assert os.listdir(tmp_path / "Work_Cal_second") == ["event-1.ics"]
+
+
+def test_calendars_which_cannot_be_told_apart(grommunio, server, tmp_path):
+    server.add_calendar("Work Cal", url="/calendars/john/calendar/")
+    server.add_calendar("Work Cal", url="/calendars/jane/calendar/")
+
+    with pytest.raises(ValueError):
+        grommunio.export(str(tmp_path))
+
+
+def test_failed_export_keeps_combined_calendar(grommunio, server, calendar, tmp_path):
+    server.sync = False
+    grommunio.export(str(tmp_path), save_single_events=True)
+    server.put(calendar, "event-0", "Event 0 modified")
+    server.put(calendar, "event-3", "Event 3")
+    grommunio.default_multiget_size = 1
+    server.fail("calendar-multiget", after=1)
+
+    with pytest.raises(ConnectionError):
+        grommunio.export(str(tmp_path), save_single_events=True)
+
+    assert sorted(combined_summaries(tmp_path / "Work_Cal.ics")) == ["Event 0", "Event 1", "Event 2"]
+    assert not os.path.exists(tmp_path / "Work_Cal.ics.tmp")
+
+
+@pytest.mark.parametrize("sync", [True, False], ids=["sync", "no-sync"])
+def test_combined_calendar_downloads_changed_events_only(grommunio, server, calendar, tmp_path, sync):
+    server.sync = sync
+    grommunio.export(str(tmp_path / "incremental"))
+    server.put(calendar, "event-0", "Event 0 modified")
+    server.requests.clear()
+    grommunio.export(str(tmp_path / "incremental"))
+
+    listing = "sync-collection" if sync else "calendar-query"
+    assert server.requests == ["PROPFIND", listing, "calendar-multiget"]
+    assert (sorted(combined_summaries(tmp_path / "incremental" / "Work_Cal.ics"))
+            == ["Event 0 modified", "Event 1", "Event 2"])
+
+    # Rebuilt again from the rebuilt file
+    server.delete(calendar, f"{calendar.url}event-2.ics")
+    server.put(calendar, "event-3", "Event 3")
+    grommunio.export(str(tmp_path / "incremental"))
+    grommunio.export(str(tmp_path / "fresh"))
+    assert exported_state(str(tmp_path / "incremental")) == exported_state(str(tmp_path / "fresh"))
+
+
+def test_modified_combined_calendar_is_rebuilt(grommunio, server, calendar, tmp_path):
+    grommunio.export(str(tmp_path))
+    combined_path = tmp_path / "Work_Cal.ics"
+    combined_path.write_bytes(combined_path.read_bytes().replace(b"SUMMARY:Event 1", b"SUMMARY:Edited"))
+    server.put(calendar, "event-0", "Event 0 modified")
+    grommunio.export(str(tmp_path))
+
+    assert sorted(combined_summaries(combined_path)) == ["Event 0 modified", "Event 1", "Event 2"]
+
+
+def test_multiget_batches(grommunio, server, calendar, tmp_path):
+    grommunio.default_multiget_size = 2
+    grommunio.export(str(tmp_path), save_single_events=True)
+    for index in range(5):
+        server.put(calendar, f"event-{index}", f"Event {index} modified")
+    server.multiget_sizes.clear()
+    grommunio.export(str(tmp_path), save_single_events=True)
+
+    assert server.multiget_sizes == [2, 2, 1]
+    assert sorted(combined_summaries(tmp_path / "Work_Cal.ics")) == [f"Event {index} modified" for index in range(5)]
@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+from conftest import make_ics
+from gromex.grommunio import _event_filename, _event_uid
+
+
+@pytest.mark.parametrize("data, uid", [
+    (make_ics("plain-uid", "Plain"), "plain-uid"),
+    (make_ics("folded", "Folded").replace("UID:folded", "UID:fol\r\n ded\r\n\tuid"), "foldeduid"),
+    (make_ics("parameter", "Parameter").replace("UID:", "UID;X-TEST=value:"), "parameter"),
+    # Not matched by the regular expression, read by icalendar instead
+    (make_ics("lowercase", "Lowercase").replace("UID:", "uid:"), "lowercase"),
+])
+def test_event_uid(data, uid):
+    assert _event_uid(data.encode()) == uid
+
+
+def test_event_filename():
+    assert _event_filename("040000008200E00074C5B7101A82E008") == "040000008200E00074C5B7101A82E008.ics"
+    assert _event_filename("ev-0@example.com").startswith("ev-0_example.com_")
+    # UIDs which only differ in unsafe characters get different file names
+    assert _event_filename("a+b") != _event_filename("a/b")
+
+
+def test_colliding_uids_get_separate_files(grommunio, server, tmp_path):
+    calendar = server.add_calendar("Work Cal")
+    server.put(calendar, "a+b", "Plus")
+    server.put(calendar, "a/b", "Slash")
+    grommunio.export(str(tmp_path), save_single_events=True)
+
+    files = os.listdir(tmp_path / "Work_Cal")
+    assert len(files) == 2
+    server.requests.clear()
+    grommunio.export(str(tmp_path), save_single_events=True)
+    assert server.requests == ["PROPFIND"]
+
+
+def test_files_of_earlier_versions_are_replaced(grommunio, server, tmp_path):
+    calendar = server.add_calendar("Work Cal")
+    server.put(calendar, "ev-0@example.com", "Event 0")
+    server.put(calendar, "ev-1", "Event 1")
+    os.makedirs(tmp_path / "Work_Cal")
+    (tmp_path / "Work_Cal" / "ev-0@example.com.ics").write_text("old")
+    grommunio.export(str(tmp_path), save_single_events=True)
+
+    assert sorted(os.listdir(tmp_path / "Work_Cal")) == [_event_filename("ev-0@example.com"), "ev-1.ics"]
@@ -0,0 +1,15 @@
+import types
+
+import requests
+
+from gromex import GrommunioCalendars
+
+
+def test_transient_server_errors_are_retried():
+    grommunio = GrommunioCalendars(username="john", password="secret", autoconnect=False)
+    grommunio.client = types.SimpleNamespace(session=requests.Session())
+    grommunio._configure_session()
+
+    retries = grommunio.client.session.get_adapter("https://example.com").max_retries
+    assert retries.is_retry("REPORT", 502) and retries.is_retry("PROPFIND", 503)
+    assert not retries.is_retry("REPORT", 404)
@@ -0,0 +1,51 @@
+import pytest
+
+
+@pytest.fixture
+def calendars(server):
+    work = server.add_calendar("Work Cal")
+    for index in range(3):
+        server.put(work, f"event-{index}", f"Event {index}")
+    server.put(work, "task-0", "Task 0", component="VTODO")
+    server.add_calendar("Empty")
+    return server.calendars
+
+
+def test_export_after_summary_sees_server_changes(grommunio, server, calendars, tmp_path):
+    server.sync = False
+    work = calendars[0]
+    grommunio.export(str(tmp_path))
+    grommunio.show_summary()
+    server.put(work, "event-0", "Event 0 modified")
+    grommunio.export(str(tmp_path))
+    grommunio.export(str(tmp_path))
+
+    with open(tmp_path / "Work_Cal.ics", 'rb') as ics_file:
+        assert b"SUMMARY:Event 0 modified" in ics_file.read()
+
+
+def test_export_reuses_summary_listing(grommunio, server, calendars, tmp_path):
+    server.sync = False
+    grommunio.show_summary()
+    server.requests.clear()
+    grommunio.export(str(tmp_path))
+
+    # The CTags and the download of the events, but no listing of their ETags
+    assert sorted(server.requests) == ["PROPFIND", "PROPFIND", "calendar-query"]
+
+
+def test_summary_counts(grommunio, server, calendars, capsys):
+    grommunio.show_summary()
+
+    assert capsys.readouterr().out.splitlines() == [
+        "Calendar Name: Work Cal",
+        "Supported Components: ['VEVENT', 'VTODO']",
+        " - VEVENT (Events): 3 items",
+        " - VTODO (Tasks): 1 items",
+        "Calendar Name: Empty",
+        "Supported Components: ['VEVENT', 'VTODO']",
+        " - VEVENT (Events): 0 items",
+        " - VTODO (Tasks): 0 items",
+    ]
+    # A single listing of the components of each calendar
+    assert server.requests.count("calendar-query") == 2
@@ -0,0 +1,81 @@
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+END = datetime(2024, 7, 1, tzinfo=timezone.utc)
+MONTHLY = [f"2024{month:02d}15T100000Z" for month in range(1, 13)]
+
+
+@pytest.fixture
+def calendar(server):
+    calendar = server.add_calendar("Work Cal")
+    server.put(calendar, "single", "Single", starts=["20240301T100000Z"])
+    server.put(calendar, "outside", "Outside", starts=["20250101T100000Z"])
+    server.put(calendar, "monthly", "Monthly", starts=MONTHLY)
+    return calendar
+
+
+def test_windows_return_each_event_once(grommunio, server, calendar, tmp_path):
+    grommunio.export(str(tmp_path), save_single_events=True, start=START, end=END, window_days=60)
+
+    assert sorted(os.listdir(tmp_path / "Work_Cal")) == ["monthly.ics", "single.ics"]
+    data = (tmp_path / "Work_Cal.ics").read_bytes()
+    assert data.count(b"BEGIN:VEVENT") == 2
+    # Four windows of 60 days, for listing and for downloading the events
+    assert server.requests.count("calendar-query") == 8
+
+
+def test_expanded_events_are_not_split_by_windows(grommunio, server, calendar, tmp_path):
+    options = dict(save_single_events=True, start=START, end=END, expand=True, window_days=60)
+    grommunio.export(str(tmp_path), **options)
+    single_file = tmp_path / "Work_Cal" / "monthly.ics"
+    downloaded = single_file.read_bytes()
+
+    # The instances between January and June, whichever window the event was first found in
+    assert downloaded.count(b"RECURRENCE-ID:") == 6
+    assert (tmp_path / "Work_Cal.ics").read_bytes().count(b"SUMMARY:Monthly") == 6
+
+    # Downloading it again with calendar-multiget gives the same instances
+    single_file.unlink()
+    grommunio.export(str(tmp_path), **options)
+    assert single_file.read_bytes().count(b"RECURRENCE-ID:") == 6
+
+
+def test_time_range_exports_overlapping_events(grommunio, calendar, tmp_path):
+    grommunio.export(str(tmp_path), save_single_events=True, start=START, end=END)
+
+    assert sorted(os.listdir(tmp_path / "Work_Cal")) == ["monthly.ics", "single.ics"]
+    # Without expansion, recurring events are exported with their rule
+    data = (tmp_path / "Work_Cal" / "monthly.ics").read_bytes()
+    assert b"RRULE:FREQ=MONTHLY" in data and b"RECURRENCE-ID" not in data
+
+
+def test_open_time_range(grommunio, calendar, tmp_path):
+    grommunio.export(str(tmp_path), save_single_events=True, start=datetime(2024, 12, 1, tzinfo=timezone.utc))
+
+    assert sorted(os.listdir(tmp_path / "Work_Cal")) == ["monthly.ics", "outside.ics"]
+
+
+def test_expand(grommunio, calendar, tmp_path):
+    grommunio.export(str(tmp_path), start=START, end=END, expand=True)
+
+    data = (tmp_path / "Work_Cal.ics").read_bytes()
+    assert data.count(b"SUMMARY:Monthly") == 6 and data.count(b"SUMMARY:Single") == 1
+    assert b"RRULE" not in data
+
+
+def test_expand_requires_time_range(grommunio, calendar, tmp_path):
+    with pytest.raises(ValueError):
+        grommunio.export(str(tmp_path), start=START, expand=True)
+
+
+def test_changed_time_range_replaces_events(grommunio, calendar, tmp_path):
+    grommunio.export(str(tmp_path), save_single_events=True, start=START, end=END)
+    grommunio.export(str(tmp_path), save_single_events=True, start=datetime(2025, 1, 1, tzinfo=timezone.utc),
+                     end=datetime(2025, 2, 1, tzinfo=timezone.utc))
+
+    assert os.listdir(tmp_path / "Work_Cal") == ["outside.ics"]
+    assert (tmp_path / "Work_Cal.ics").read_bytes().count(b"BEGIN:VEVENT") == 1